@@ -1,12 +1,14 @@
 import abc
-from random import randrange
-from typing import Callable, Tuple, Union, Sequence, NoReturn
+from random import choice, randrange
+from typing import Callable, List, Tuple, Union, Sequence, NoReturn
 
+import numpy as np
 import pygame
 from pygame import Surface, Color
 from pygame.rect import Rect
 
 import settings as stg
+import snake_kernels
 
 # Typehints
 RGBAOutput = Tuple[int, int, int, int]
@@ -20,6 +22,11 @@ ColorValue = Union[
     Sequence[int]
 ]
 
+# Unit velocity vectors indexed by direction
+VELOCITIES = ((0, -1), (1, 0), (0, 1), (-1, 0))
+GRID_VELOCITIES = tuple((dx * stg.GRID_SIZE, dy * stg.GRID_SIZE)
+                        for dx, dy in VELOCITIES)
+
 
 class GameObject(abc.ABC):
     """Game object abstract class."""
@@ -68,6 +75,8 @@ class GameObject(abc.ABC):
         self.speed = speed
         self.direction = direction
         self.step_size = step_size
+        # Areas of the screen changed since the object was last drawn
+        self.dirty_rects = []
 
     @staticmethod
     def get_velocity(direction: int,
@@ -75,13 +84,10 @@ class GameObject(abc.ABC):
                      step_size: int = stg.GRID_SIZE
                      ) -> Tuple[int, int]:
         """Returns the velocity vector of the object."""
-        dx = round(direction % 2
-                   * (-1) ** ((direction % 3) == 0)
-                   * step_size)
-        dy = round((direction + 1) % 2
-                   * (-1) ** ((direction % 3) == 0)
-                   * step_size)
-        return dx, dy
+        if step_size == stg.GRID_SIZE:
+            return GRID_VELOCITIES[direction]
+        dx, dy = VELOCITIES[direction]
+        return dx * step_size, dy * step_size
 
     @property
     def left(self):
@@ -126,7 +132,7 @@ class GameObject(abc.ABC):
 
     def move(self, dx: int, dy: int) -> NoReturn:
         """Change object's coordinates by a given distance."""
-        self.bounds = self.bounds.move(dx, dy)
+        self.bounds.move_ip(dx, dy)
 
     def update(self, dt: float) -> NoReturn:
         """Update state of the object."""
@@ -167,23 +173,37 @@ class TextObject:
         self.text_func = text_func
         self.color = color
         self.font = pygame.font.SysFont(font_name, font_size)
-        self.bounds = self.get_surface(text_func())
+        # Rendered surface is reused until text_func returns a new string
+        self._last_text = text_func()
+        self._cached_surface, self.bounds = self.get_surface(self._last_text)
+        # Areas of the screen changed since the text was last drawn
+        self.dirty_rects = []
+        self._drawn_rect = None
 
     def draw(self, surface: Surface, centralized: bool = False):
-        text_surface, self.bounds = self.get_surface(self.text_func())
+        text_surface = self._cached_surface
         if centralized:
             pos = (self.pos[0] - self.bounds.width // 2,
                    self.pos[1])
         else:
             pos = self.pos
-        surface.blit(text_surface, pos)
+        rect = surface.blit(text_surface, pos)
+        if rect != self._drawn_rect:
+            self.dirty_rects.append(rect)
+            self._drawn_rect = rect
 
     def get_surface(self, text: str):
         text_surface = self.font.render(text, False, self.color)
         return text_surface, text_surface.get_rect()
 
     def update(self):
-        pass
+        """Re-render the text if text_func returns a new string."""
+        text = self.text_func()
+        if text != self._last_text:
+            self._cached_surface, self.bounds = self.get_surface(text)
+            self._last_text = text
+            if self._drawn_rect:
+                self.dirty_rects.append(self._drawn_rect)
 
 
 class Apple(GameObject):
@@ -213,57 +233,54 @@ class Apple(GameObject):
         """
         super().__init__(x, y, offset=offset, color=color, *args, **kwargs)
         self.lifespan = lifespan
+        self.sprite = Surface(self.bounds.size, pygame.SRCALPHA)
+        cell = self.sprite.get_rect()
+        pygame.draw.circle(self.sprite, self.color,
+                           cell.center, cell.width / 2)
+        self.sprite = self.sprite.convert_alpha()
 
     def draw(self, surface: Surface) -> NoReturn:
         """Draw shape of the object to a surface."""
-        pygame.draw.circle(
-            surface,
-            self.color,
-            self.center,
-            self.width / 2
-        )
+        surface.blit(self.sprite, self.bounds)
 
-    def respawn(self) -> NoReturn:
-        """Randomly change object's coordinates."""
-        self.bounds.x = randrange(0, self.offset[0] - self.width)
-        self.bounds.y = randrange(0, self.offset[1] - self.height)
+    def respawn(self, cells: Sequence[Tuple[int, int]] | None = None
+                ) -> NoReturn:
+        """Randomly change object's coordinates.
 
+        Args:
+            cells: Sequence[Tuple[int, int]] | None (default = None):
+                Positions to choose from, any grid cell if not given.
+        """
+        self.dirty_rects.append(self.bounds.copy())
+        if cells:
+            self.bounds.topleft = choice(cells)
+        else:
+            columns = self.offset[0] // self.step_size
+            rows = self.offset[1] // self.step_size
+            row, column = divmod(randrange(columns * rows), columns)
+            self.bounds.topleft = (column * self.step_size,
+                                   row * self.step_size)
+        self.dirty_rects.append(self.bounds.copy())
 
-class SnakePart(GameObject):
-    """ Abstract class for snake body parts. """
 
-    def __init__(
-            self, x, y,
-            offset,
-            color=(255, 255, 255),
-            speed=stg.SNAKE_SPEED,
-            direction=1,
-            *args, **kwargs,
-    ):
+class SnakePart(abc.ABC):
+    """ Abstract class for the parts mirroring the snake's end slots. """
+
+    def __init__(self, x: int, y: int, direction: int = 1):
         """Snake part initialization.
 
+        Speed, color and field size are kept by the snake itself.
+
         Args:
             x: int:
                 Horizontal position of the object.
             y: int:
                 Vertical position of the object.
-            offset: Tuple[int, int]:
-                Maximal x and y positions.
-            color: ColorValue (default white):
-                Object's color
-            speed: int (default = SNAKE_SPEED):
-                Represents the value of steps per second.
             direction: int (default = 1):
                 Direction of the object.
         """
-        super().__init__(
-            x, y,
-            offset=offset,
-            color=color,
-            speed=speed,
-            direction=direction,
-            *args, **kwargs
-        )
+        self.bounds = Rect(x, y, stg.GRID_SIZE, stg.GRID_SIZE)
+        self.direction = direction
 
     @abc.abstractmethod
     def draw(self, surface: Surface):
@@ -279,53 +296,81 @@ class SnakeHead(SnakePart):
         stg.KEYS['DOWN']: 2,
         stg.KEYS['LEFT']: 3,
     }
+    # Directions the head may turn to, indexed by its current direction
+    TURNS = (
+        frozenset((1, 3)),
+        frozenset((0, 2)),
+        frozenset((1, 3)),
+        frozenset((0, 2)),
+    )
+
+    def __init__(self, x: int, y: int, color: ColorValue, direction: int = 1):
+        super().__init__(x, y, direction)
+        self.sprite = Surface(self.bounds.size).convert()
+        self.sprite.fill(color)
 
     def draw(self, surface: Surface):
         """Draw shape of the object to a surface."""
-        pygame.draw.rect(surface, self.color, self.bounds)
+        surface.blit(self.sprite, self.bounds)
 
-    def handle(self, key: Key):
-        """Handle input key."""
-        if key in (stg.KEYS['LEFT'], stg.KEYS['RIGHT']) \
-                and self.direction % 2 != 1 \
-                or key in (stg.KEYS['UP'], stg.KEYS['DOWN']) \
-                and self.direction % 2 != 0:
-            self.direction = self.DIRECTIONS[key]
+    def handle(self, key: Key, last_direction: int | None = None):
+        """Handle input key.
 
-
-class SnakeBody(SnakePart):
-    """ Represents snake body part. """
-
-    def draw(self, surface: Surface):
-        """Draw shape of the object to a surface."""
-        pygame.draw.circle(surface, self.color, self.center, self.width / 2)
+        Args:
+            key: Key:
+                Pressed key.
+            last_direction: int | None (default = None):
+                Direction of the last step taken. Turns are checked
+                against it, so several presses between two steps cannot
+                turn the head back. Current direction is used if not given.
+        """
+        if last_direction is None:
+            last_direction = self.direction
+        direction = self.DIRECTIONS.get(key)
+        if direction in self.TURNS[last_direction]:
+            self.direction = direction
 
 
 class SnakeTail(SnakePart):
     """ Represents snake tail. """
 
+    def __init__(self, x: int, y: int, color: ColorValue, direction: int = 1):
+        super().__init__(x, y, direction)
+        # One sprite per direction
+        cell = Rect((0, 0), self.bounds.size)
+        self.sprites = []
+        for direction in range(4):
+            sprite = Surface(cell.size, pygame.SRCALPHA)
+            pygame.draw.polygon(sprite, color,
+                                self.get_points(cell, direction))
+            self.sprites.append(sprite.convert_alpha())
+
     def draw(self, surface: Surface):
         """Draw shape of the object to a surface."""
+        surface.blit(self.sprites[self.direction], self.bounds)
+
+    @staticmethod
+    def get_points(bounds: Rect, direction: int) -> Tuple[Tuple[int, int], ...]:
+        """Returns the tail triangle vertices inside the given bounds."""
         all_points = (
-            self.bounds.midbottom,
-            self.bounds.topleft,
-            self.bounds.midleft,
-            self.bounds.topright,
-            self.bounds.midtop,
-            self.bounds.bottomright,
-            self.bounds.midright,
-            self.bounds.bottomleft,
+            bounds.midbottom,
+            bounds.topleft,
+            bounds.midleft,
+            bounds.topright,
+            bounds.midtop,
+            bounds.bottomright,
+            bounds.midright,
+            bounds.bottomleft,
         )
-        points = (
-            all_points[self.direction * 2],
-            all_points[(self.direction * 2 + 1) % 8],
-            all_points[(self.direction * 2 + 3) % 8],
+        return (
+            all_points[direction * 2],
+            all_points[(direction * 2 + 1) % 8],
+            all_points[(direction * 2 + 3) % 8],
         )
-        pygame.draw.polygon(surface, self.color, points)
 
 
 class Snake:
-    """ Collection of the all snake parts. """
+    """ Snake stored as parallel arrays of its parts. """
 
     def __init__(
             self, x: int, y: int,
@@ -354,60 +399,117 @@ class Snake:
                 Number of body parts besides head and tail.
 
         """
-        self.parts = [
-            SnakeHead(x, y, color=color, speed=speed,
-                      direction=direction, offset=offset),
-            SnakeTail(x, y, color=color, speed=speed,
-                      direction=direction, offset=offset)
+        # Parts are stored from the head (first slot) to the tail (last
+        # used slot), one slot per grid cell of the field.
+        max_size = (offset[0] // stg.GRID_SIZE) * (offset[1] // stg.GRID_SIZE)
+        self.xs = np.empty(max_size, dtype=np.int32)
+        self.ys = np.empty(max_size, dtype=np.int32)
+        self.dirs = np.empty(max_size, dtype=np.uint8)
+        # Number of used slots, head and tail included
+        self.size = length + 2
+
+        # Shift body and tail behind the head
+        dx, dy = GameObject.get_velocity(direction, speed)
+        steps = np.arange(self.size)
+        self.xs[:self.size] = x - dx * steps
+        self.ys[:self.size] = y - dy * steps
+        self.dirs[:self.size] = direction
+
+        # Head and tail only mirror the first and the last slots
+        self.head = SnakeHead(x, y, color=color, direction=direction)
+        self.tail = SnakeTail(x, y, color=color, direction=direction)
+        self._sync_parts()
+        # Cells covered by the snake and the field cells left free. Each
+        # free cell's index in the list is kept so it is removed in O(1).
+        self.occupied = set(zip(self.xs[:self.size].tolist(),
+                                self.ys[:self.size].tolist()))
+        self.free_cells = [
+            (cx, cy)
+            for cx in range(0, offset[0], stg.GRID_SIZE)
+            for cy in range(0, offset[1], stg.GRID_SIZE)
+            if (cx, cy) not in self.occupied
         ]
-
-        # Add body parts
-        for _ in range(length):
-            self.parts.insert(1, SnakeBody(
-                x, y, color=color, speed=speed,
-                direction=direction, offset=offset))
-        # Shift body
-        for i in range(1, len(self.parts)):
-            velocity = GameObject.get_velocity(direction, speed)
-            self.parts[i].move(*map(lambda n: -n * i, velocity))
+        self._free_index = {
+            cell: i for i, cell in enumerate(self.free_cells)
+        }
 
         self.color = color
         self.offset = offset
         self.speed = speed
+        # Seconds between two steps
+        self._step_period = 1.0 / speed
         self.time = 0
         self.got_apple = False
-
-    @property
-    def head(self):
-        return self.parts[0]
+        self.collided = False
+        # Maximal head coordinates inside the field
+        self._max_x = offset[0] - stg.GRID_SIZE
+        self._max_y = offset[1] - stg.GRID_SIZE
+        # Areas of the screen changed since the snake was last drawn
+        self.dirty_rects = []
+
+        # Body parts share one pre-rendered sprite
+        self._body_sprite = Surface(self.head.bounds.size, pygame.SRCALPHA)
+        cell = self._body_sprite.get_rect()
+        pygame.draw.circle(self._body_sprite, color,
+                           cell.center, cell.width / 2)
+        self._body_sprite = self._body_sprite.convert_alpha()
+
+    def _sync_parts(self):
+        """Copy the first and the last slots to the head and the tail."""
+        last = self.size - 1
+        self.head.bounds.topleft = (int(self.xs[0]), int(self.ys[0]))
+        self.tail.bounds.topleft = (int(self.xs[last]), int(self.ys[last]))
+        self.tail.direction = int(self.dirs[last])
+
+    def _mark_dirty(self):
+        """Mark the cells under the head and the tail as changed."""
+        self.dirty_rects.append(self.head.bounds.copy())
+        self.dirty_rects.append(self.tail.bounds.copy())
 
     def move(self, dt: float):
         """Move snake."""
-        tmp_direction = self.head.direction
-        tmp_x, tmp_y = self.head.bounds.x, self.head.bounds.y
-        self.head.update(dt)
-        for part in self.parts[1:]:
-            part.bounds.x, tmp_x = tmp_x, part.bounds.x
-            part.bounds.y, tmp_y = tmp_y, part.bounds.y
-            tmp_direction, part.direction = part.direction, tmp_direction
+        self._mark_dirty()
+        tail = self.tail.bounds.topleft
+        direction = self.head.direction
+        dx, dy = GameObject.get_velocity(direction, self.speed)
+        self.collided = snake_kernels.step(
+            self.xs, self.ys, self.dirs, self.size,
+            direction, dx, dy, self._max_x, self._max_y,
+        )
+        self._sync_parts()
+        if self.tail.bounds.topleft != tail:
+            self._vacate(tail)
+        self._occupy(self.head.bounds.topleft)
+        self._mark_dirty()
+
+    def _occupy(self, cell: Tuple[int, int]):
+        """Mark a cell as covered, taking it out of the free cells."""
+        self.occupied.add(cell)
+        index = self._free_index.pop(cell, None)
+        if index is not None:
+            # Fill the gap with the last free cell
+            last = self.free_cells.pop()
+            if last != cell:
+                self.free_cells[index] = last
+                self._free_index[last] = index
+
+    def _vacate(self, cell: Tuple[int, int]):
+        """Mark a cell as no longer covered, adding it to the free cells."""
+        self.occupied.discard(cell)
+        if cell not in self._free_index:
+            self._free_index[cell] = len(self.free_cells)
+            self.free_cells.append(cell)
 
     def grow(self, dt):
         """Insert additional body part after snake's head."""
-        body = SnakeBody(
-            self.head.bounds.x,
-            self.head.bounds.y,
-            color=self.color,
-            speed=self.head.speed,
-            offset=self.offset,
-            direction=self.head.direction
-        )
-        self.parts.insert(1, body)
-        self.head.update(dt)
-
+        # Taking one more slot keeps the tail in place on the next move
+        if self.size < len(self.xs):
+            self.size += 1
+        self.move(dt)
 
     def update(self, dt: float) -> NoReturn:
         """Update state of the snake."""
-        if self.time > 1 / self.head.speed:
+        if self.time > self._step_period:
             if self.got_apple:
                 self.grow(dt)
                 self.got_apple = False
@@ -417,33 +519,69 @@ class Snake:
         else:
             self.time += dt
 
-    def draw(self, surface: Surface) -> NoReturn:
-        """Draw every part of the snake."""
-        for part in self.parts:
-            part.draw(surface)
+    def tick(
+            self, dt: float,
+            surface: Surface,
+            clear: Callable[[Rect], None],
+            dirty_rects: List[Rect],
+    ) -> NoReturn:
+        """Update the snake and redraw it wherever the screen changed.
+
+        Args:
+            dt: float:
+                Time passed since the previous tick.
+            surface: Surface:
+                Surface the snake stays drawn on between ticks.
+            clear: Callable[[Rect], None]:
+                Restores the background under a rect.
+            dirty_rects: List[Rect]:
+                Rects already restored this frame. The cells changed by
+                the snake are cleared and added to them.
+        """
+        self.update(dt)
+        for rect in self.dirty_rects:
+            clear(rect)
+        dirty_rects.extend(self.dirty_rects)
+        self.dirty_rects.clear()
+        if dirty_rects:
+            self.draw(surface, dirty_rects)
+
+    def draw(self, surface: Surface,
+             rects: Sequence[Rect] | None = None) -> NoReturn:
+        """Draw the parts of the snake overlapping the given rects, or
+        every part if no rects are given."""
+        n = self.size
+        if rects is None:
+            indices = np.arange(n)
+        else:
+            xs, ys = self.xs[:n], self.ys[:n]
+            size = stg.GRID_SIZE
+            overlaps = np.zeros(n, dtype=bool)
+            for rect in rects:
+                overlaps |= ((xs < rect.right) & (xs + size > rect.left)
+                             & (ys < rect.bottom) & (ys + size > rect.top))
+            indices = np.flatnonzero(overlaps)
+
+        last = n - 1
+        head = self.head.sprite
+        body = self._body_sprite
+        tail = self.tail.sprites[self.tail.direction]
+        sprites = [
+            (head if i == 0 else tail if i == last else body, (x, y))
+            for i, x, y in zip(indices.tolist(),
+                               self.xs[indices].tolist(),
+                               self.ys[indices].tolist())
+        ]
+        # fblits is only provided by pygame-ce
+        if hasattr(surface, 'fblits'):
+            surface.fblits(sprites)
+        else:
+            surface.blits(sprites, doreturn=False)
 
     def handle(self, key: Key) -> NoReturn:
         """Handle input key."""
-        self.head.handle(key)
+        self.head.handle(key, int(self.dirs[0]))
 
     def check_collision(self) -> bool:
-        # Check walls collision
-        if self.head.left < 0 \
-                or self.head.right > self.offset[0] \
-                or self.head.top < 0 \
-                or self.head.bottom > self.offset[1]:
-            return True
-
-        # Check self collision
-        for part in self.parts[1:]:
-            if self.head.bounds.colliderect(part.bounds):
-                return True
-
-        return False
-
-    def colliderect(self, rect: Rect):
-        """Check if snake collide with a given rect."""
-        for part in self.parts:
-            if part.bounds.colliderect(rect):
-                return True
-        return False
+        """Check if snake's last step hit a wall or the snake itself."""
+        return self.collided
@@ -1,9 +1,8 @@
 import sys
 import abc
-from collections import defaultdict
 
 import pygame
-from random import randrange
+from random import choice
 
 import game_objects as go
 import settings as stg
@@ -36,36 +35,61 @@ class Game(abc.ABC):
             background_color: ColorValue:
                 Background color value.
         """
-        self.back_image = False
-        if back_image_filename:
-            self.background = pygame.image.load(back_image_filename)
-            self.back_image = True
-        else:
-            self.background = background_color
         self.frame_rate = frame_rate
         self.game_over = False
-        self.objects = []
+        # Objects are kept in a list per type
+        self.snakes: list[go.Snake] = []
+        self.apples: list[go.Apple] = []
+        self.texts: list[go.TextObject] = []
         self.score = 0
 
         pygame.mixer.pre_init(44100, 16, 2, 4096)
         pygame.init()
         pygame.font.init()
         self.surface = pygame.display.set_mode((window_width, window_height))
+        # Background image is converted to the window's pixel format,
+        # which needs the window to exist
+        self.back_image = False
+        if back_image_filename:
+            self.background = pygame.image.load(back_image_filename).convert()
+            self.back_image = True
+        else:
+            self.background = background_color
+        # Areas of the window to repaint, the whole window at start
+        self.dirty_rects = [self.surface.get_rect()]
         pygame.display.set_caption(caption)
+        # Keep the event queue free of events the game never handles
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN,
+                                  pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE])
         self.clock = pygame.time.Clock()
-        self.keydown_handlers = defaultdict(list)
-        self.keyup_handlers = defaultdict(list)
+        self.keydown_handlers = {}
+        self.keyup_handlers = {}
         self.collision_handlers = {}
 
     def update(self, dt):
-        """Update all the objects."""
-        for o in self.objects:
-            o.update(dt)
+        """Update all the objects.
+
+        Snakes go last: they redraw themselves right away over the
+        background restored under the other objects' changes.
+        """
+        for apple in self.apples:
+            apple.update(dt)
+        for text in self.texts:
+            text.update()
+        self.update_background()
+        for snake in self.snakes:
+            snake.tick(dt, self.surface, self.clear, self.dirty_rects)
 
     def draw(self):
-        """Draw all the objects."""
-        for o in self.objects:
-            o.draw(self.surface)
+        """Draw all the objects besides snakes, which are drawn on tick."""
+        for apple in self.apples:
+            apple.draw(self.surface)
+        for text in self.texts:
+            text.draw(self.surface)
+            # A new text may cover more than its old area
+            self.dirty_rects.extend(text.dirty_rects)
+            text.dirty_rects.clear()
 
     def handle_events(self):
         """Event handling."""
@@ -73,13 +97,16 @@ class Game(abc.ABC):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
-            elif event.type == pygame.KEYDOWN and event.key in stg.KEYS.values():
-                for handler in self.keydown_handlers[event.key]:
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                # The window lost its contents, repaint all of it
+                self.dirty_rects.append(self.surface.get_rect())
+            elif event.type == pygame.KEYDOWN:
+                handler = self.keydown_handlers.get(event.key)
+                if handler:
                     handler(event.key)
-                pygame.event.clear()
-                break
             # elif event.type == pygame.KEYUP:
-            #     for handler in self.keyup_handlers[event.key]:
+            #     handler = self.keyup_handlers.get(event.key)
+            #     if handler:
             #         handler(event.key)
 
     @abc.abstractmethod
@@ -87,24 +114,36 @@ class Game(abc.ABC):
         """Collision handling."""
         pass
 
-    def update_background(self):
+    def clear(self, rect: pygame.Rect):
+        """Restore the background under a rect."""
         if self.back_image:
-            self.surface.blit(self.background, (0, 0))
+            self.surface.blit(self.background, rect, rect)
         else:
-            self.surface.fill(self.background)
+            self.surface.fill(self.background, rect)
+
+    def update_background(self):
+        """Restore the background under every rect changed by the objects.
+
+        Snakes restore the cells they change themselves while ticking.
+        """
+        for objects in (self.apples, self.texts):
+            for o in objects:
+                self.dirty_rects.extend(o.dirty_rects)
+                o.dirty_rects.clear()
+        for rect in self.dirty_rects:
+            self.clear(rect)
 
     def run(self):
         """ Main game cycle. """
         dt = 0.1
         while not self.game_over:
-            self.update_background()
-
             self.handle_collisions()
             self.handle_events()
             self.update(dt)
             self.draw()
 
-            pygame.display.update()
+            pygame.display.update(self.dirty_rects)
+            self.dirty_rects.clear()
             dt = self.clock.tick(self.frame_rate) / 1000
 
     def finish(self):
@@ -123,45 +162,36 @@ class SnakeGame(Game):
             length=stg.SNAKE_INIT_LENGTH,
         )
         self.apple = go.Apple(
-            randrange(0,
-                      stg.WINDOW_WIDTH - stg.GRID_SIZE,
-                      stg.GRID_SIZE),
-            randrange(0,
-                      stg.WINDOW_HEIGHT - stg.GRID_SIZE,
-                      stg.GRID_SIZE),
+            *choice(self.snake.free_cells),
             offset=(stg.WINDOW_WIDTH, stg.WINDOW_HEIGHT),
             color=stg.RGB['APPLE'],
         )
         # Fill objects list
-        self.objects.append(self.snake)
-        self.objects.append(self.apple)
+        self.snakes.append(self.snake)
+        self.apples.append(self.apple)
         # Fill keys handlers
-        self.keydown_handlers[stg.KEYS['LEFT']].append(self.snake.head.handle)
-        self.keydown_handlers[stg.KEYS['RIGHT']].append(self.snake.head.handle)
-        self.keydown_handlers[stg.KEYS['UP']].append(self.snake.head.handle)
-        self.keydown_handlers[stg.KEYS['DOWN']].append(self.snake.head.handle)
+        self.keydown_handlers[stg.KEYS['LEFT']] = self.snake.handle
+        self.keydown_handlers[stg.KEYS['RIGHT']] = self.snake.handle
+        self.keydown_handlers[stg.KEYS['UP']] = self.snake.handle
+        self.keydown_handlers[stg.KEYS['DOWN']] = self.snake.handle
         # Fill collision handlers
         self.collision_handlers['apple'] = self.get_apple
         self.collision_handlers['wall'] = self.finish
 
     def get_apple(self):
-        while self.snake.colliderect(self.apple.bounds):
-            self.apple.respawn()
+        free_cells = self.snake.free_cells
+        if not free_cells:
+            # The snake fills the whole field
+            self.finish()
+            return
+        self.apple.respawn(free_cells)
         self.snake.got_apple = True
         self.score += 1
 
-
-    def check_apple_snake_collision(self) -> bool:
-        for obj in self.objects:
-            if isinstance(obj, go.Apple) \
-                    and obj.bounds.colliderect(self.snake.head.bounds):
-                return True
-        return False
-
     def handle_collisions(self) -> str | None:
         if self.snake.check_collision():
             self.collision_handlers['wall']()
-        if self.check_apple_snake_collision():
+        if self.snake.head.bounds.topleft == self.apple.bounds.topleft:
             self.collision_handlers['apple']()
         return None
 
@@ -0,0 +1,65 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _step_loop(xs, ys, dirs, n, direction, dx, dy, max_x, max_y):
+    """Shift the snake by one cell and check where its head ended up.
+
+    Args:
+        xs, ys, dirs: ndarray:
+            Positions and directions of the snake parts, head first.
+        n: int:
+            Number of used slots.
+        direction: int:
+            Direction of the head's next step.
+        dx, dy: int:
+            Head's velocity for that direction.
+        max_x, max_y: int:
+            Maximal head coordinates inside the field.
+
+    Returns True if the head hit a wall or another part of the snake.
+
+    """
+    hx = xs[0] + dx
+    hy = ys[0] + dy
+    dirs[0] = direction
+    # Shift from the tail, testing every part's new cell on the way
+    hit = False
+    for i in range(n - 1, 0, -1):
+        xs[i] = xs[i - 1]
+        ys[i] = ys[i - 1]
+        dirs[i] = dirs[i - 1]
+        if xs[i] == hx and ys[i] == hy:
+            hit = True
+    xs[0] = hx
+    ys[0] = hy
+    return hit or hx < 0 or hx > max_x or hy < 0 or hy > max_y
+
+
+def _step_numpy(xs, ys, dirs, n, direction, dx, dy, max_x, max_y):
+    """NumPy version of `_step_loop` for when Numba is not installed."""
+    hx = xs[0] + dx
+    hy = ys[0] + dy
+    dirs[0] = direction
+    xs[1:n] = xs[:n - 1]
+    ys[1:n] = ys[:n - 1]
+    dirs[1:n] = dirs[:n - 1]
+    xs[0] = hx
+    ys[0] = hy
+    if hx < 0 or hx > max_x or hy < 0 or hy > max_y:
+        return True
+    return bool(np.any((xs[1:n] == hx) & (ys[1:n] == hy)))
+
+
+# Compiled loop is faster than slicing, the interpreted one is not
+if njit:
+    step = njit(cache=True)(_step_loop)
+    # Compile for the snake's dtypes now rather than on its first step
+    step(np.zeros(2, dtype=np.int32), np.zeros(2, dtype=np.int32),
+         np.zeros(2, dtype=np.uint8), 2, 1, 1, 0, 1, 1)
+else:
+    step = _step_numpy